@@ -1,9 +1,7 @@
 # Codes By Visionnn
 
 import sys
-from pathlib import Path
-
-from rich.console import Console
+import time
 
 from cli import (
     console,
@@ -15,17 +13,45 @@ from cli import (
     COLOR_DIM,
     COLOR_PRIMARY,
 )
-from config import STORAGE_DIR, BASE_DIR
+from config import (
+    STORAGE_DIR,
+    BASE_DIR,
+    MAINTENANCE_STAMP_FILE,
+    MAINTENANCE_INTERVAL_SECONDS,
+)
 from logger import log
 from metadata import cleanup_expired
 from storage import flatten_storage
 
 
+def _maintenance_due() -> bool:
+    """
+    Decide whether startup maintenance needs to run.
+
+    It is skipped when the last sweep finished less than
+    MAINTENANCE_INTERVAL_SECONDS ago and STORAGE_DIR has not been modified since.
+    """
+    try:
+        last_run = float(MAINTENANCE_STAMP_FILE.read_text(encoding="utf-8"))
+        storage_mtime = STORAGE_DIR.stat().st_mtime
+    except (OSError, ValueError):
+        return True
+    if time.time() - last_run >= MAINTENANCE_INTERVAL_SECONDS:
+        return True
+    return storage_mtime > last_run
+
+
 def _initialize() -> None:
     """Create required directories and run startup maintenance."""
     BASE_DIR.mkdir(parents=True, exist_ok=True)
     STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 
+    if not _maintenance_due():
+        log.debug("Startup maintenance skipped: ran recently and storage is unchanged.")
+        return
+
+    succeeded = True
+
     # Flatten any nested subdirectories inside storage (files must live at top level)
     try:
         moved = flatten_storage()
@@ -33,6 +59,7 @@ def _initialize() -> None:
             log.info(f"Startup: flattened {moved} file(s) from nested storage subdirectories.")
     except Exception as e:
         log.warning(f"Startup storage flatten failed: {e}")
+        succeeded = False
 
     # Clean up expired files silently on startup
     try:
@@ -41,6 +68,16 @@ def _initialize() -> None:
             log.info(f"Startup cleanup: removed {removed} expired file(s).")
     except Exception as e:
         log.warning(f"Startup cleanup failed: {e}")
+        succeeded = False
+
+    # Only a clean sweep is recorded, so a failed one is retried next launch
+    if not succeeded:
+        return
+
+    try:
+        MAINTENANCE_STAMP_FILE.write_text(str(time.time()), encoding="utf-8")
+    except OSError as e:
+        log.warning(f"Could not record startup maintenance time: {e}")
 
 
 def main() -> None:
@@ -81,7 +118,9 @@ def main() -> None:
             console.print(f"\n  [{COLOR_DIM}]Thank you for using SafeDrop. Goodbye![/{COLOR_DIM}]\n")
             sys.exit(0)
 
-        # Pause before returning to menu
+        # Pause before returning to menu; piped or scripted runs carry straight on
+        if not sys.stdin.isatty():
+            continue
         try:
             console.print(f"\n  [{COLOR_DIM}]Press Enter to return to the main menu...[/{COLOR_DIM}]", end="")
             input()
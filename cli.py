@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from rich import box
 from rich.align import Align
@@ -28,6 +28,9 @@ COLOR_DIM       = "dim white"
 COLOR_ACCENT    = "magenta"
 COLOR_HIGHLIGHT = "bold bright_white"
 
+# Display format per size unit: B, KB, MB, GB
+_SIZE_FORMATS = ("{} B", "{:.1f} KB", "{:.1f} MB", "{:.2f} GB")
+
 
 BANNER = r"""
   ____         __       ____
@@ -38,28 +41,23 @@ _\ \/ _ `/ _  / -_) _  / __/ __/ \/ _ \
 """
 
 
-def print_banner() -> None:
-    """Print the SafeDrop ASCII art banner with version and author info."""
-    console.print()
-
+def _build_banner() -> List[Align]:
+    """Build the banner renderables (static, so built once at import)."""
     banner_text = Text(BANNER, style=f"bold {COLOR_PRIMARY}")
-    console.print(Align.center(banner_text))
-
     subtitle = Text(f"  {APP_TAGLINE}", style=f"italic {COLOR_DIM}")
-    console.print(Align.center(subtitle))
-
     info_line = Text(
         f"  v{APP_VERSION}  ·  Developed by {APP_AUTHOR}",
         style=f"dim {COLOR_ACCENT}",
     )
-    console.print(Align.center(info_line))
-    console.print()
-    console.print(Rule(style=f"dim {COLOR_PRIMARY}"))
-    console.print()
+    return [
+        Align.center(banner_text),
+        Align.center(subtitle),
+        Align.center(info_line),
+    ]
 
 
-def print_main_menu() -> None:
-    """Print the main menu options."""
+def _build_main_menu() -> Align:
+    """Build the main menu table (static, so built once at import)."""
     table = Table(
         show_header=False,
         box=box.ROUNDED,
@@ -75,7 +73,26 @@ def print_main_menu() -> None:
     table.add_row("  2", "Download File", "Retrieve a file using its unique ID")
     table.add_row("  3", "Exit",          "Quit SafeDrop")
 
-    console.print(Align.center(table))
+    return Align.center(table)
+
+
+_BANNER_RENDERABLES = _build_banner()
+_MAIN_MENU = _build_main_menu()
+
+
+def print_banner() -> None:
+    """Print the SafeDrop ASCII art banner with version and author info."""
+    console.print()
+    for renderable in _BANNER_RENDERABLES:
+        console.print(renderable)
+    console.print()
+    console.print(Rule(style=f"dim {COLOR_PRIMARY}"))
+    console.print()
+
+
+def print_main_menu() -> None:
+    """Print the main menu options."""
+    console.print(_MAIN_MENU)
     console.print()
 
 
@@ -146,6 +163,14 @@ def prompt_note() -> str:
     )
 
 
+def format_size(size_bytes: int) -> str:
+    """Format a byte count into a human-readable string."""
+    # Each unit is 1024x the previous, so the unit index is (bit_length - 1) // 10
+    index = min((max(size_bytes, 1).bit_length() - 1) // 10, len(_SIZE_FORMATS) - 1)
+    value = size_bytes / (1 << (10 * index)) if index else size_bytes
+    return _SIZE_FORMATS[index].format(value)
+
+
 def print_success(message: str) -> None:
     console.print(f"\n  [{COLOR_SUCCESS}]✓ {message}[/{COLOR_SUCCESS}]")
 
@@ -170,7 +195,7 @@ def print_section(title: str) -> None:
 
 def print_file_id_card(file_id: str, filename: str, size: int, expiry_days: Optional[int], auto_delete: bool) -> None:
     """Display a styled card showing the upload result and file ID."""
-    size_str = _format_size(size)
+    size_str = format_size(size)
     expiry_str = f"{expiry_days} day(s)" if expiry_days else "Never"
     auto_del_str = "Yes" if auto_delete else "No"
 
@@ -223,7 +248,7 @@ def print_download_result(dest_path: Path, original_name: str, size: int, downlo
     table.add_column("Value", style=COLOR_HIGHLIGHT)
 
     table.add_row("File",           original_name)
-    table.add_row("Size",           _format_size(size))
+    table.add_row("Size",           format_size(size))
     table.add_row("Saved to",       str(dest_path))
     table.add_row("Download #",     str(download_count))
 
@@ -253,16 +278,3 @@ def print_security_warning(reason: str) -> None:
         )
     )
     console.print()
-
-
-def _format_size(size_bytes: int) -> str:
-    """Format a byte count into a human-readable string."""
-    if size_bytes < 1024:
-        return f"{size_bytes} B"
-    elif size_bytes < 1024 ** 2:
-        return f"{size_bytes / 1024:.1f} KB"
-    elif size_bytes < 1024 ** 3:
-        return f"{size_bytes / 1024**2:.1f} MB"
-    else:
-        return f"{size_bytes / 1024**3:.2f} GB"
-
@@ -8,6 +8,7 @@ BASE_DIR = Path.home() / ".safedrop"
 STORAGE_DIR = BASE_DIR / "storage"
 METADATA_FILE = BASE_DIR / "metadata.json"
 LOG_FILE = BASE_DIR / "safedrop.log"
+MAINTENANCE_STAMP_FILE = BASE_DIR / ".last_maint"
 
 # ─── Limits ───────────────────────────────────────────────────────────────────
 MAX_FILE_SIZE_MB = 500
@@ -17,6 +18,11 @@ MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 DEFAULT_EXPIRY_DAYS = 7
 MAX_EXPIRY_DAYS = 365
 
+# ─── Startup Maintenance ──────────────────────────────────────────────────────
+# Storage flattening and expiry cleanup are skipped if they ran within this
+# many seconds and the storage directory has not changed since.
+MAINTENANCE_INTERVAL_SECONDS = 3600
+
 # ─── ID Settings ──────────────────────────────────────────────────────────────
 ID_LENGTH = 12
 
@@ -1,96 +1,289 @@
 # Codes By Visionnn
 
 import base64
+import hmac
 import os
+import struct
+import sys
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
-from cryptography.fernet import Fernet, InvalidToken
-
 from logger import log
 
+# The cryptography package is imported inside the functions that need it:
+# it is comparatively slow to load and the main menu never touches it.
+
+# Algorithm identifiers, stored as the first byte of every encrypted file
+ALG_AES_256_GCM = 0x01
+ALG_CHACHA20_POLY1305 = 0x02
+
+# Both AEADs use a 96-bit nonce and a 128-bit tag
+NONCE_SIZE = 12
+TAG_SIZE = 16
+_HEADER_SIZE = 1 + NONCE_SIZE
+
+# Files are streamed through the cipher in chunks of this size so memory
+# use stays flat regardless of file size.
+CHUNK_SIZE = 1 << 20  # 1 MB
+
+# Files written before the switch to AES-GCM are raw Fernet tokens, which
+# always begin with this base64 prefix (version byte 0x80 + timestamp).
+_LEGACY_FERNET_PREFIX = b"gAAAAA"
+
 
 def generate_key() -> str:
     """
-    Generate a new Fernet encryption key.
+    Generate a new 256-bit encryption key (valid for either algorithm).
 
     Returns:
-        Base64-encoded key string (safe to store in JSON metadata).
+        URL-safe base64-encoded key string (safe to store in JSON metadata).
     """
-    key = Fernet.generate_key()
+    key = base64.urlsafe_b64encode(os.urandom(32))
     return key.decode("utf-8")
 
 
-def _get_fernet(key_str: str) -> Fernet:
-    """Instantiate a Fernet object from a base64 key string."""
-    return Fernet(key_str.encode("utf-8"))
+def _decode_key(key_str: str) -> bytes:
+    """Decode a base64 key string into raw key bytes."""
+    return base64.urlsafe_b64decode(key_str.encode("utf-8"))
+
+
+@lru_cache(maxsize=None)
+def _has_aes_acceleration() -> bool:
+    """
+    Best-effort check for hardware AES instructions (AES-NI / ARMv8 AES).
+
+    On Linux the CPU flags in /proc/cpuinfo are consulted. Elsewhere the CPU
+    is assumed to have them, as every platform macOS and Windows run on does.
+    The outcome is logged once, since it decides which AEAD new uploads use.
+    """
+    has_aes = _cpu_reports_aes()
+    if has_aes:
+        log.info("Hardware AES available; new uploads use AES-256-GCM.")
+    else:
+        log.info("No hardware AES detected; new uploads use ChaCha20-Poly1305.")
+    return has_aes
+
+
+def _cpu_reports_aes() -> bool:
+    """Read the AES CPU flag, assuming it is present when it cannot be read."""
+    if not sys.platform.startswith("linux"):
+        return True
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name.strip().lower() in ("flags", "features"):
+                    return "aes" in value.split()
+    except OSError:
+        pass
+    return True
+
+
+def _preferred_algorithm() -> int:
+    """AES-GCM when the CPU accelerates it, otherwise ChaCha20-Poly1305."""
+    return ALG_AES_256_GCM if _has_aes_acceleration() else ALG_CHACHA20_POLY1305
+
+
+class _ChaCha20Poly1305Stream:
+    """
+    Incremental ChaCha20-Poly1305 (RFC 8439) without associated data.
+
+    cryptography only offers this AEAD as a one-shot call, so the raw ChaCha20
+    stream and a Poly1305 MAC are combined here exactly as the RFC specifies;
+    the output matches ChaCha20Poly1305.encrypt() byte for byte. It mirrors the
+    update_into()/finalize()/tag interface of a GCM cipher context. When a tag
+    is given it decrypts, and finalize() raises InvalidTag on a mismatch.
+    """
+
+    def __init__(self, key: bytes, nonce: bytes, tag: Optional[bytes] = None):
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms
+        from cryptography.hazmat.primitives.poly1305 import Poly1305
+
+        # Keystream block 0 yields the one-time Poly1305 key; data starts at block 1
+        block0 = Cipher(algorithms.ChaCha20(key, struct.pack("<I", 0) + nonce), mode=None)
+        one_time_key = block0.encryptor().update(bytes(32))
+        self._cipher = Cipher(
+            algorithms.ChaCha20(key, struct.pack("<I", 1) + nonce), mode=None
+        ).encryptor()
+        self._mac = Poly1305(one_time_key)
+        self._expected_tag = tag
+        self._length = 0
+        self.tag: Optional[bytes] = None
+
+    def update_into(self, data, buf) -> int:
+        n = self._cipher.update_into(data, buf)
+        # Poly1305 always authenticates the ciphertext side
+        self._mac.update(data if self._expected_tag is not None else memoryview(buf)[:n])
+        self._length += n
+        return n
+
+    def finalize(self) -> bytes:
+        from cryptography.exceptions import InvalidTag
+
+        self._cipher.finalize()
+        self._mac.update(bytes(-self._length % 16) + struct.pack("<QQ", 0, self._length))
+        self.tag = self._mac.finalize()
+        if self._expected_tag is not None and not hmac.compare_digest(self.tag, self._expected_tag):
+            raise InvalidTag()
+        return b""
+
+
+def _cipher_context(algorithm: int, key: bytes, nonce: bytes, tag: Optional[bytes] = None):
+    """
+    Create a streaming cipher context for the given algorithm id.
+
+    Without a tag an encryptor is returned; with one, a decryptor whose
+    finalize() verifies it.
+    """
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+    if algorithm == ALG_AES_256_GCM:
+        cipher = Cipher(algorithms.AES(key), modes.GCM(nonce, tag))
+        return cipher.encryptor() if tag is None else cipher.decryptor()
+    if algorithm == ALG_CHACHA20_POLY1305:
+        return _ChaCha20Poly1305Stream(key, nonce, tag)
+    raise InvalidTag(f"Unknown encryption algorithm id: {algorithm:#04x}")
 
 
 def encrypt_file(src_path: Path, dest_path: Path, key_str: str) -> None:
     """
     Encrypt a file and write the encrypted content to dest_path.
 
+    The output layout is ``algorithm id || nonce || ciphertext || tag``.
+    AES-256-GCM is used when the CPU has AES instructions, ChaCha20-Poly1305
+    otherwise. The file is streamed through the cipher in CHUNK_SIZE pieces
+    rather than read into memory.
+
     Args:
         src_path:  Path to the plaintext source file.
         dest_path: Path where the encrypted file will be written.
-        key_str:   Base64-encoded Fernet key string.
+        key_str:   Base64-encoded 256-bit key string.
 
     Raises:
         FileNotFoundError: If src_path does not exist.
         OSError: On read/write errors.
     """
-    fernet = _get_fernet(key_str)
+    key = _decode_key(key_str)
     src_path = Path(src_path)
     dest_path = Path(dest_path)
 
     dest_path.parent.mkdir(parents=True, exist_ok=True)
 
-    log.debug(f"Encrypting '{src_path.name}' → '{dest_path.name}'")
+    log.debug("Encrypting '%s' → '%s'", src_path.name, dest_path.name)
 
-    with open(src_path, "rb") as f:
-        plaintext = f.read()
+    algorithm = _preferred_algorithm()
+    nonce = os.urandom(NONCE_SIZE)
+    encryptor = _cipher_context(algorithm, key, nonce)
 
-    ciphertext = fernet.encrypt(plaintext)
+    # update_into() needs room for one extra block of buffered output
+    in_buf = bytearray(CHUNK_SIZE)
+    out_buf = bytearray(CHUNK_SIZE + 15)
+    in_view = memoryview(in_buf)
+    out_view = memoryview(out_buf)
 
-    with open(dest_path, "wb") as f:
-        f.write(ciphertext)
+    with open(src_path, "rb") as src_f, open(dest_path, "wb") as dest_f:
+        dest_f.write(bytes((algorithm,)) + nonce)
+        while True:
+            n = src_f.readinto(in_buf)
+            if not n:
+                break
+            written = encryptor.update_into(in_view[:n], out_buf)
+            dest_f.write(out_view[:written])
+        dest_f.write(encryptor.finalize())
+        dest_f.write(encryptor.tag)
+        encrypted_size = dest_f.tell()
 
-    log.debug(f"Encryption complete. Encrypted size: {len(ciphertext):,} bytes")
+    log.debug("Encryption complete. Encrypted size: %d bytes", encrypted_size)
 
 
 def decrypt_file(src_path: Path, dest_path: Path, key_str: str) -> None:
     """
     Decrypt an encrypted file and write the plaintext to dest_path.
 
+    The algorithm is taken from the file's header byte and the ciphertext is
+    streamed in CHUNK_SIZE pieces. If authentication fails the partially
+    written dest_path is removed before the error is raised.
+    Files stored by older releases (raw Fernet tokens) are still accepted.
+
     Args:
         src_path:  Path to the encrypted source file.
         dest_path: Path where the decrypted file will be written.
-        key_str:   Base64-encoded Fernet key string.
+        key_str:   Base64-encoded 256-bit key string.
 
     Raises:
-        InvalidToken: If the key is wrong or the file is corrupted.
+        InvalidTag: If the key is wrong or the file is corrupted.
         FileNotFoundError: If src_path does not exist.
         OSError: On read/write errors.
     """
-    fernet = _get_fernet(key_str)
+    from cryptography.exceptions import InvalidTag
+
     src_path = Path(src_path)
     dest_path = Path(dest_path)
 
     dest_path.parent.mkdir(parents=True, exist_ok=True)
 
-    log.debug(f"Decrypting '{src_path.name}' → '{dest_path.name}'")
+    log.debug("Decrypting '%s' → '%s'", src_path.name, dest_path.name)
+
+    with open(src_path, "rb") as src_f:
+        header = src_f.read(_HEADER_SIZE)
+        if header.startswith(_LEGACY_FERNET_PREFIX):
+            _decrypt_legacy_fernet(header + src_f.read(), src_path, dest_path, key_str)
+            return
+
+        total = os.fstat(src_f.fileno()).st_size
+        remaining = total - _HEADER_SIZE - TAG_SIZE
+        if remaining < 0:
+            log.error("Decryption failed for '%s': file is truncated.", src_path.name)
+            raise InvalidTag()
+
+        src_f.seek(total - TAG_SIZE)
+        tag = src_f.read(TAG_SIZE)
+        src_f.seek(_HEADER_SIZE)
+
+        try:
+            decryptor = _cipher_context(header[0], _decode_key(key_str), header[1:], tag)
+        except InvalidTag:
+            log.error("Decryption failed for '%s': unknown algorithm id.", src_path.name)
+            raise
 
-    with open(src_path, "rb") as f:
-        ciphertext = f.read()
+        in_buf = bytearray(CHUNK_SIZE)
+        out_buf = bytearray(CHUNK_SIZE + 15)
+        in_view = memoryview(in_buf)
+        out_view = memoryview(out_buf)
+
+        with open(dest_path, "wb") as dest_f:
+            try:
+                while remaining:
+                    n = src_f.readinto(in_view[:min(remaining, CHUNK_SIZE)])
+                    if not n:
+                        raise InvalidTag()
+                    remaining -= n
+                    written = decryptor.update_into(in_view[:n], out_buf)
+                    dest_f.write(out_view[:written])
+                dest_f.write(decryptor.finalize())
+                decrypted_size = dest_f.tell()
+            except InvalidTag:
+                dest_f.close()
+                dest_path.unlink(missing_ok=True)
+                log.error("Decryption failed for '%s': invalid key or corrupted file.", src_path.name)
+                raise
+
+    log.debug("Decryption complete. Decrypted size: %d bytes", decrypted_size)
+
+
+def _decrypt_legacy_fernet(token: bytes, src_path: Path, dest_path: Path, key_str: str) -> None:
+    """Decrypt a whole-file Fernet token written by an older release."""
+    from cryptography.fernet import Fernet, InvalidToken
 
     try:
-        plaintext = fernet.decrypt(ciphertext)
+        plaintext = Fernet(key_str.encode("utf-8")).decrypt(token)
     except InvalidToken:
-        log.error(f"Decryption failed for '{src_path.name}': invalid key or corrupted file.")
+        log.error("Decryption failed for '%s': invalid key or corrupted file.", src_path.name)
         raise
 
     with open(dest_path, "wb") as f:
         f.write(plaintext)
 
-    log.debug(f"Decryption complete. Decrypted size: {len(plaintext):,} bytes")
-
+    log.debug("Decryption complete. Decrypted size: %d bytes", len(plaintext))
@@ -1,5 +1,6 @@
 # Codes By Visionnn
 
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -12,6 +13,7 @@ from cli import (
     print_warning,
     print_info,
     print_download_result,
+    format_size,
     prompt_file_id,
     prompt_download_dir,
     COLOR_PRIMARY,
@@ -20,7 +22,7 @@ from cli import (
 )
 from id_generator import is_valid_id_format, normalize_id
 from logger import log
-from metadata import get_metadata, update_metadata, delete_metadata
+from metadata import get_metadata, get_expiry_epoch, update_metadata, delete_metadata
 from storage import retrieve_file, delete_stored_file
 
 
@@ -50,26 +52,22 @@ def run_download() -> None:
 
     if record is None:
         print_error(f"File not found. ID '{file_id}' does not exist.")
-        log.warning(f"DOWNLOAD FAILED | id='{file_id}' reason='not found'")
+        log.warning("DOWNLOAD FAILED | id='%s' reason='not found'", file_id)
         return
 
     # ── Step 4: Check expiry ──────────────────────────────────────────────────
-    expiry_str = record.get("expiry_time")
-    if expiry_str:
-        try:
-            expiry = datetime.fromisoformat(expiry_str)
-            if datetime.now(timezone.utc) > expiry:
-                print_error(
-                    f"This file has expired and is no longer available.\n"
-                    f"  Expired at: {expiry.strftime('%Y-%m-%d %H:%M UTC')}"
-                )
-                log.info(f"DOWNLOAD BLOCKED | id='{file_id}' reason='expired'")
-                # Clean up expired file
-                delete_stored_file(file_id)
-                delete_metadata(file_id)
-                return
-        except ValueError:
-            pass  # Malformed expiry — proceed anyway
+    expiry_epoch = get_expiry_epoch(record)  # None if no/malformed expiry
+    if expiry_epoch is not None and time.time() > expiry_epoch:
+        expiry = datetime.fromtimestamp(expiry_epoch, timezone.utc)
+        print_error(
+            f"This file has expired and is no longer available.\n"
+            f"  Expired at: {expiry.strftime('%Y-%m-%d %H:%M UTC')}"
+        )
+        log.info("DOWNLOAD BLOCKED | id='%s' reason='expired'", file_id)
+        # Clean up expired file
+        delete_stored_file(file_id)
+        delete_metadata(file_id)
+        return
 
     # ── Step 5: Show file info ────────────────────────────────────────────────
     original_name = record.get("original_name", "unknown")
@@ -79,7 +77,7 @@ def run_download() -> None:
     auto_delete = record.get("auto_delete", False)
 
     console.print(f"\n  [{COLOR_DIM}]File:[/{COLOR_DIM}] [{COLOR_PRIMARY}]{original_name}[/{COLOR_PRIMARY}]")
-    console.print(f"  [{COLOR_DIM}]Size:[/{COLOR_DIM}] {_format_size(file_size)}")
+    console.print(f"  [{COLOR_DIM}]Size:[/{COLOR_DIM}] {format_size(file_size)}")
     console.print(f"  [{COLOR_DIM}]Downloads so far:[/{COLOR_DIM}] {download_count}")
     if note:
         console.print(f"  [{COLOR_DIM}]Note:[/{COLOR_DIM}] {note}")
@@ -95,7 +93,7 @@ def run_download() -> None:
     encryption_key = record.get("encryption_key")
     if not encryption_key:
         print_error("File record is corrupted (missing encryption key).")
-        log.error(f"DOWNLOAD ERROR | id='{file_id}' reason='missing encryption key'")
+        log.error("DOWNLOAD ERROR | id='%s' reason='missing encryption key'", file_id)
         return
 
     with Progress(
@@ -114,11 +112,11 @@ def run_download() -> None:
             )
         except FileNotFoundError:
             print_error("Stored file is missing. It may have been deleted or expired.")
-            log.error(f"DOWNLOAD ERROR | id='{file_id}' reason='stored file missing'")
+            log.error("DOWNLOAD ERROR | id='%s' reason='stored file missing'", file_id)
             return
         except Exception as e:
             print_error(f"Failed to retrieve file: {e}")
-            log.error(f"DOWNLOAD ERROR | id='{file_id}' error='{e}'")
+            log.error("DOWNLOAD ERROR | id='%s' error='%s'", file_id, e)
             return
 
     # ── Step 8: Update download counter ──────────────────────────────────────
@@ -126,15 +124,15 @@ def run_download() -> None:
     update_metadata(file_id, {"download_count": new_count})
 
     log.info(
-        f"DOWNLOAD | file='{original_name}' id='{file_id}' "
-        f"dest='{dest_path}' download_count={new_count}"
+        "DOWNLOAD | file='%s' id='%s' dest='%s' download_count=%d",
+        original_name, file_id, dest_path, new_count,
     )
 
     # ── Step 9: Handle auto-delete ────────────────────────────────────────────
     if auto_delete:
         delete_stored_file(file_id)
         delete_metadata(file_id)
-        log.info(f"AUTO-DELETE | id='{file_id}' file='{original_name}'")
+        log.info("AUTO-DELETE | id='%s' file='%s'", file_id, original_name)
         console.print(
             f"\n  [{COLOR_DIM}]File has been deleted from SafeDrop storage (auto-delete).[/{COLOR_DIM}]"
         )
@@ -146,15 +144,3 @@ def run_download() -> None:
         size=file_size,
         download_count=new_count,
     )
-
-
-def _format_size(size_bytes: int) -> str:
-    if size_bytes < 1024:
-        return f"{size_bytes} B"
-    elif size_bytes < 1024 ** 2:
-        return f"{size_bytes / 1024:.1f} KB"
-    elif size_bytes < 1024 ** 3:
-        return f"{size_bytes / 1024**2:.1f} MB"
-    else:
-        return f"{size_bytes / 1024**3:.2f} GB"
-
@@ -1,5 +1,6 @@
 # Codes By Visionnn
 
+import re
 import secrets
 import string
 from config import ID_LENGTH
@@ -8,6 +9,16 @@ from config import ID_LENGTH
 # Character set: uppercase letters + digits (no ambiguous chars like 0/O, 1/I/l)
 _ALPHABET = string.ascii_uppercase + string.digits
 _ALPHABET = _ALPHABET.replace("O", "").replace("I", "").replace("0", "").replace("1", "")
+_ALPHABET_BYTES = _ALPHABET.encode("ascii")
+
+# Translation table mapping every random byte to an alphabet character. The
+# alphabet has exactly 32 characters, so masking with 0x1F is unbiased.
+_BYTE_TO_CHAR = bytes(_ALPHABET_BYTES[b & 0x1F] for b in range(256))
+
+_GROUP_SIZE = ID_LENGTH // 3
+
+# Exactly ID_LENGTH alphabet characters (dashes removed before matching)
+_ID_RE = re.compile(f"[{re.escape(_ALPHABET)}]{{{ID_LENGTH}}}")
 
 
 def generate_id() -> str:
@@ -19,12 +30,8 @@ def generate_id() -> str:
 
     Format: XXXX-XXXX-XXXX (groups of 4 separated by dashes for readability)
     """
-    group_size = ID_LENGTH // 3
-    groups = [
-        "".join(secrets.choice(_ALPHABET) for _ in range(group_size))
-        for _ in range(3)
-    ]
-    return "-".join(groups)
+    raw = secrets.token_bytes(ID_LENGTH).translate(_BYTE_TO_CHAR).decode("ascii")
+    return f"{raw[:_GROUP_SIZE]}-{raw[_GROUP_SIZE:_GROUP_SIZE*2]}-{raw[_GROUP_SIZE*2:]}"
 
 
 def strip_dashes(file_id: str) -> str:
@@ -41,8 +48,7 @@ def normalize_id(file_id: str) -> str:
     """
     raw = file_id.strip().upper().replace("-", "").replace(" ", "")
     if len(raw) == ID_LENGTH:
-        group_size = ID_LENGTH // 3
-        return f"{raw[:group_size]}-{raw[group_size:group_size*2]}-{raw[group_size*2:]}"
+        return f"{raw[:_GROUP_SIZE]}-{raw[_GROUP_SIZE:_GROUP_SIZE*2]}-{raw[_GROUP_SIZE*2:]}"
     return file_id.strip().upper()
 
 
@@ -52,8 +58,5 @@ def is_valid_id_format(file_id: str) -> bool:
     Accepts both dashed (XXXX-XXXX-XXXX) and plain (XXXXXXXXXXXX) formats.
     """
     normalized = file_id.strip().upper().replace("-", "")
-    if len(normalized) != ID_LENGTH:
-        return False
-    valid_chars = set(_ALPHABET)
-    return all(c in valid_chars for c in normalized)
+    return _ID_RE.fullmatch(normalized) is not None
 
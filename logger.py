@@ -1,7 +1,10 @@
 # Codes By Visionnn
 
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from config import LOG_FILE, APP_NAME
 
@@ -9,6 +12,9 @@ from config import LOG_FILE, APP_NAME
 def get_logger(name: str = APP_NAME) -> logging.Logger:
     """
     Returns a configured logger that writes to both file and stderr (errors only).
+
+    Records are handed to a queue and written by a background listener thread,
+    so logging calls never block the caller on file I/O.
     """
     logger = logging.getLogger(name)
 
@@ -26,14 +32,21 @@ def get_logger(name: str = APP_NAME) -> logging.Logger:
         datefmt="%Y-%m-%d %H:%M:%S",
     )
     file_handler.setFormatter(file_fmt)
-    logger.addHandler(file_handler)
 
     # ── Stderr Handler (WARNING and above only) ────────────────────────────────
     stderr_handler = logging.StreamHandler(sys.stderr)
     stderr_handler.setLevel(logging.WARNING)
     stderr_fmt = logging.Formatter(fmt="[%(levelname)s] %(message)s")
     stderr_handler.setFormatter(stderr_fmt)
-    logger.addHandler(stderr_handler)
+
+    # ── Queue (hands records to a background writer thread) ────────────────────
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(
+        log_queue, file_handler, stderr_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)  # Flush remaining records on exit
+    logger.addHandler(QueueHandler(log_queue))
 
     return logger
 
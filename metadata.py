@@ -2,6 +2,12 @@
 SafeDrop Metadata Manager
 Manages the JSON metadata store for all uploaded files.
 
+The store is a snapshot (metadata.json) plus an append-only change log
+(metadata.log) next to it. Every change appends one JSON line to the log
+instead of rewriting the snapshot; the current state is the snapshot with
+the log replayed over it. Once the log outgrows the snapshot it is folded
+back in (compaction) and truncated.
+
 Schema per file record:
 {
     "id":               str,   # Unique file ID (dashed format)
@@ -10,19 +16,32 @@ Schema per file record:
     "size":             int,   # Original file size in bytes
     "upload_time":      str,   # ISO 8601 timestamp
     "expiry_time":      str,   # ISO 8601 timestamp (or null)
+    "expiry_epoch":     float, # Same expiry as a Unix timestamp (or null)
     "download_count":   int,   # Number of times downloaded
     "auto_delete":      bool,  # Delete after first download?
-    "encryption_key":   str,   # Base64 Fernet key
+    "encryption_key":   str,   # Base64 AES-256 key
     "note":             str,   # Optional uploader note
 }
+
+Log line per change:
+    {"op": "put",    "key": str, "record":  dict}
+    {"op": "update", "key": str, "updates": dict}
+    {"op": "delete", "key": str}
 """
 
 import json
 import os
 import threading
-from datetime import datetime, timezone
+import time
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib json module is used instead
+    orjson = None
 
 from config import METADATA_FILE
 from logger import log
@@ -30,37 +49,275 @@ from logger import log
 # Thread lock for safe concurrent access
 _lock = threading.Lock()
 
+# The log is compacted once it is larger than this many times the snapshot
+_COMPACT_RATIO = 2
+# ...and at least this large, so small stores are not compacted constantly
+_COMPACT_MIN_LOG_SIZE = 64 * 1024
+
+# In-memory view of the store, kept in step with the files by _sync()
+_state: Dict[str, dict] = {}
+# (snapshot path, mtime_ns, size) the state was loaded from
+_snapshot_sig: Optional[Tuple[str, Optional[int], Optional[int]]] = None
+# How many bytes of the log have been replayed into _state
+_log_offset = 0
+
+
+def _dumps(obj: Any, indent: bool = True) -> bytes:
+    """Serialize to UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        text = json.dumps(obj, indent=2, ensure_ascii=False)
+    else:
+        text = json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+    return text.encode("utf-8")
+
+
+def _loads(raw: bytes) -> Any:
+    """Parse UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class _StorePaths(NamedTuple):
+    """Filesystem paths that make up one metadata store."""
+
+    snapshot: str   # metadata.json
+    log: str        # metadata.log, next to the snapshot
+    tmp: str        # staging file for atomic snapshot writes
+    directory: str
+
+
+@lru_cache(maxsize=None)
+def _store_paths(metadata_file: Path) -> _StorePaths:
+    """
+    Plain string paths for a metadata file, built once per METADATA_FILE
+    value so the hot paths can call os.* directly without pathlib overhead.
+    """
+    snapshot = os.fspath(metadata_file)
+    return _StorePaths(
+        snapshot=snapshot,
+        log=os.fspath(metadata_file.with_suffix(".log")),
+        tmp=snapshot + ".tmp",
+        directory=os.path.dirname(snapshot) or os.curdir,
+    )
+
+
+def _paths() -> _StorePaths:
+    """Paths for the current METADATA_FILE."""
+    return _store_paths(METADATA_FILE)
+
+
+def _snapshot_signature() -> Tuple[str, Optional[int], Optional[int]]:
+    """Identify the current snapshot file so a rewrite can be detected."""
+    snapshot = _paths().snapshot
+    try:
+        st = os.stat(snapshot)
+    except OSError:
+        return snapshot, None, None
+    return snapshot, st.st_mtime_ns, st.st_size
+
 
 def _load() -> Dict[str, dict]:
-    """Load the metadata JSON file. Returns empty dict if not found."""
-    if not METADATA_FILE.exists():
-        return {}
+    """Load the metadata JSON snapshot. Returns empty dict if not found."""
     try:
-        with open(METADATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, OSError) as e:
+        with open(_paths().snapshot, "rb") as f:
+            return _loads(f.read())
+    except FileNotFoundError:
+        return {}
+    # Covers JSONDecodeError (orjson's subclasses it) and UnicodeDecodeError
+    except (ValueError, OSError) as e:
         log.error(f"Failed to load metadata: {e}")
         return {}
 
 
+def _apply(entry: dict) -> None:
+    """
+    Apply one change log entry to the in-memory state.
+
+    Raises ValueError for an entry that is valid JSON but not a well-formed
+    change, before touching the state.
+    """
+    if not isinstance(entry, dict) or not isinstance(entry.get("key"), str):
+        raise ValueError(f"malformed entry: {entry!r:.80}")
+    op = entry.get("op")
+    key = entry["key"]
+    if op == "put":
+        if not isinstance(entry.get("record"), dict):
+            raise ValueError(f"put without a record dict for key {key}")
+        _state[key] = entry["record"]
+    elif op == "update":
+        if not isinstance(entry.get("updates"), dict):
+            raise ValueError(f"update without an updates dict for key {key}")
+        if key in _state:
+            _state[key].update(entry["updates"])
+    elif op == "delete":
+        _state.pop(key, None)
+
+
+def _replay_log() -> None:
+    """Apply any log lines written since the last replay."""
+    global _log_offset
+
+    try:
+        with open(_paths().log, "rb") as f:
+            f.seek(_log_offset)
+            chunk = f.read()
+    except FileNotFoundError:
+        return
+    except OSError as e:
+        log.error(f"Failed to read metadata log: {e}")
+        return
+
+    # A partially written last line is left for the next replay
+    start = 0
+    while True:
+        end = chunk.find(b"\n", start)
+        if end < 0:
+            break
+        line = chunk[start:end]
+        # Advance past each line before applying it, so a bad entry is
+        # skipped once rather than stalling (and re-applying) the replay
+        _log_offset += end + 1 - start
+        start = end + 1
+        if not line.strip():
+            continue
+        try:
+            _apply(_loads(line))
+        # JSONDecodeError and UnicodeDecodeError are both ValueErrors
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            log.error(f"Skipping corrupt metadata log entry: {e}")
+
+
+def _sync() -> None:
+    """
+    Bring the in-memory state up to date with the files on disk.
+
+    Only new log lines are read in the common case. The snapshot is reloaded
+    when it has been rewritten (by compaction, possibly in another process)
+    or when the log has shrunk below what was already replayed.
+    """
+    global _snapshot_sig, _log_offset
+
+    signature = _snapshot_signature()
+    try:
+        log_size = os.stat(_paths().log).st_size
+    except OSError:
+        log_size = 0
+
+    if signature != _snapshot_sig or log_size < _log_offset:
+        _state.clear()
+        _state.update(_load())
+        _snapshot_sig = signature
+        _log_offset = 0
+
+    if log_size > _log_offset:
+        _replay_log()
+
+
 def _save(data: Dict[str, dict]) -> None:
-    """Persist the metadata dict to disk."""
-    METADATA_FILE.parent.mkdir(parents=True, exist_ok=True)
+    """
+    Write the metadata dict to disk as the new snapshot.
+
+    The data is written to a temp file, fsynced and renamed over the old
+    snapshot, so a crash leaves either the old or the new snapshot intact.
+    """
+    paths = _paths()
+    os.makedirs(paths.directory, exist_ok=True)
+    try:
+        fd = os.open(paths.tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_dumps(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(paths.tmp, paths.snapshot)
+    except OSError as e:
+        log.error(f"Failed to save metadata: {e}")
+        raise
+
+
+def _compact() -> None:
+    """Fold the log into a fresh snapshot and truncate it."""
+    global _snapshot_sig, _log_offset
+
+    # The snapshot is durable before the log it replaces is emptied
+    _save(_state)
+    with open(_paths().log, "wb"):
+        pass
+    _snapshot_sig = _snapshot_signature()
+    _log_offset = 0
+    log.debug("Metadata log compacted.")
+
+
+def _append(*entries: dict) -> None:
+    """
+    Append change entries to the log and apply them to the in-memory state.
+
+    Must be called with _lock held and after _sync().
+    """
+    paths = _paths()
+    os.makedirs(paths.directory, exist_ok=True)
+    payload = b"".join(_dumps(entry, indent=False) + b"\n" for entry in entries)
     try:
-        with open(METADATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        fd = os.open(paths.log, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "ab") as f:
+            # A torn last line (e.g. from a crash mid-write) must not swallow
+            # this entry: terminate it so it is skipped as a line of its own
+            if os.fstat(fd).st_size:
+                os.lseek(fd, -1, os.SEEK_END)
+                if os.read(fd, 1) != b"\n":
+                    payload = b"\n" + payload
+            f.write(payload)
+            log_size = f.tell()
     except OSError as e:
         log.error(f"Failed to save metadata: {e}")
         raise
 
+    # Replaying picks up these entries along with anything another
+    # process appended in the meantime
+    _replay_log()
+
+    snapshot_size = _snapshot_sig[2] or 0
+    if log_size > max(_COMPACT_RATIO * snapshot_size, _COMPACT_MIN_LOG_SIZE):
+        # The entries are already committed to the log, so a failed compaction
+        # must not be reported as a failed write; the next write retries it
+        try:
+            _compact()
+        except OSError as e:
+            log.warning(f"Metadata compaction failed, will retry: {e}")
+
+
+def get_expiry_epoch(record: dict) -> Optional[float]:
+    """
+    Return a record's expiry as a Unix timestamp, or None if it never expires.
+
+    Uses the numeric "expiry_epoch" field so checks are a plain float compare.
+    Records written before that field existed fall back to parsing the ISO
+    "expiry_time" string. Malformed values are treated as no expiry.
+    """
+    epoch = record.get("expiry_epoch")
+    if epoch is not None:
+        return epoch
+    expiry_str = record.get("expiry_time")
+    if not expiry_str:
+        return None
+    try:
+        return datetime.fromisoformat(expiry_str).timestamp()
+    except ValueError:
+        return None
+
+
+def _normalize(file_id: str) -> str:
+    """Store key for an ID: dashes stripped, uppercased."""
+    return file_id.replace("-", "").upper()
+
 
 def save_metadata(record: dict) -> None:
     """Add or update a file record in the metadata store."""
     with _lock:
-        data = _load()
-        file_id = record["id"].replace("-", "")
-        data[file_id] = record
-        _save(data)
+        _sync()
+        _append({"op": "put", "key": _normalize(record["id"]), "record": record})
         log.debug(f"Metadata saved for ID: {record['id']}")
 
 
@@ -71,10 +328,11 @@ def get_metadata(file_id: str) -> Optional[dict]:
     Accepts both dashed (XXXX-XXXX-XXXX) and plain (XXXXXXXXXXXX) formats.
     Returns None if not found.
     """
-    key = file_id.replace("-", "").upper()
+    key = _normalize(file_id)
     with _lock:
-        data = _load()
-        return data.get(key)
+        _sync()
+        record = _state.get(key)
+        return dict(record) if record is not None else None
 
 
 def delete_metadata(file_id: str) -> bool:
@@ -83,12 +341,11 @@ def delete_metadata(file_id: str) -> bool:
 
     Returns True if the record was found and deleted, False otherwise.
     """
-    key = file_id.replace("-", "").upper()
+    key = _normalize(file_id)
     with _lock:
-        data = _load()
-        if key in data:
-            del data[key]
-            _save(data)
+        _sync()
+        if key in _state:
+            _append({"op": "delete", "key": key})
             log.debug(f"Metadata deleted for ID: {file_id}")
             return True
         return False
@@ -100,21 +357,20 @@ def update_metadata(file_id: str, updates: dict) -> bool:
 
     Returns True if the record was found and updated.
     """
-    key = file_id.replace("-", "").upper()
+    key = _normalize(file_id)
     with _lock:
-        data = _load()
-        if key not in data:
+        _sync()
+        if key not in _state:
             return False
-        data[key].update(updates)
-        _save(data)
+        _append({"op": "update", "key": key, "updates": updates})
         return True
 
 
 def list_all() -> List[dict]:
     """Return all file records as a list."""
     with _lock:
-        data = _load()
-        return list(data.values())
+        _sync()
+        return [dict(record) for record in _state.values()]
 
 
 def cleanup_expired() -> int:
@@ -126,33 +382,27 @@ def cleanup_expired() -> int:
     """
     from storage import delete_stored_file
 
-    now = datetime.now(timezone.utc)
-    removed = 0
+    now = time.time()
+    removed = []
 
     with _lock:
-        data = _load()
+        _sync()
         expired_keys = []
 
-        for key, record in data.items():
-            expiry_str = record.get("expiry_time")
-            if expiry_str:
-                try:
-                    expiry = datetime.fromisoformat(expiry_str)
-                    if expiry <= now:
-                        expired_keys.append(key)
-                except ValueError:
-                    pass
+        for key, record in _state.items():
+            expiry = get_expiry_epoch(record)
+            if expiry is not None and expiry <= now:
+                expired_keys.append(key)
 
         for key in expired_keys:
-            record = data[key]
+            record = _state[key]
             file_id = record["id"]
             # Delete the stored (encrypted) file
             delete_stored_file(file_id)
-            del data[key]
-            removed += 1
+            removed.append({"op": "delete", "key": key})
             log.info(f"Expired file removed: {record.get('original_name', '?')} (ID: {file_id})")
 
         if removed:
-            _save(data)
+            _append(*removed)
 
-    return removed
+    return len(removed)
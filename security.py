@@ -12,9 +12,18 @@ Checks performed:
 """
 
 import math
+import mmap
 import os
+import re
+from collections import Counter
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, Iterator, List, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; entropy falls back to pure Python
+    np = None
 
 from config import (
     DANGEROUS_EXTENSIONS,
@@ -28,105 +37,245 @@ from logger import log
 
 ScanResult = Tuple[bool, str]  # (is_safe, reason)
 
+# Lowercased once so check_extension is a single hash lookup even if the
+# config lists an extension in another case
+_DANGEROUS_EXTENSIONS = frozenset(ext.lower() for ext in DANGEROUS_EXTENSIONS)
+
+# All suspicious patterns compiled into one case-insensitive alternation so the
+# content is scanned in a single pass instead of once per pattern.
+_SCRIPT_PATTERN_RE = re.compile(
+    b"|".join(re.escape(p) for p in SUSPICIOUS_PATTERNS),
+    re.IGNORECASE,
+)
+# Maps a lowercased match back to the pattern as written in config
+_PATTERN_BY_LOWER = {p.lower(): p for p in SUSPICIOUS_PATTERNS}
+# Files up to this size are pattern-scanned in full...
+_MAX_PATTERN_SCAN_SIZE = 10 * 1024 * 1024  # 10 MB
+# ...larger ones only in this many bytes at their start and at their end
+_PATTERN_SAMPLE_SIZE = 64 * 1024  # 64 KB
+
+
+def _build_signature_table() -> Dict[int, List[Tuple[int, Dict[bytes, str]]]]:
+    """
+    Group DANGEROUS_SIGNATURES by offset, then by signature length.
+
+    Each header is then checked with one slice and one dict lookup per
+    distinct (offset, length) pair instead of one comparison per signature.
+    Longer signatures are tried first so the most specific match wins.
+    """
+    grouped: Dict[int, Dict[int, Dict[bytes, str]]] = {}
+    for offset, signature, description in DANGEROUS_SIGNATURES:
+        by_length = grouped.setdefault(offset, {})
+        by_length.setdefault(len(signature), {}).setdefault(signature, description)
+    return {
+        offset: sorted(by_length.items(), reverse=True)
+        for offset, by_length in grouped.items()
+    }
+
+
+_SIGNATURES_BY_OFFSET = _build_signature_table()
+
+# Below this size a file is read outright instead of memory-mapped
+_MMAP_MIN_SIZE = 4096
+
+
+@contextmanager
+def _mapped_file(filepath: Path) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    Map a file read-only so checks can slice or search it without copying
+    it into a Python buffer first. Files smaller than _MMAP_MIN_SIZE are
+    simply read, as setting up a mapping costs more than copying them (and
+    empty files cannot be mapped at all).
+    """
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size < _MMAP_MIN_SIZE:
+            yield f.read()
+            return
+
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Truncated to zero length since the fstat
+            yield b""
+            return
+
+        with mapping:
+            yield mapping
+
 
 def check_extension(filepath: Path) -> ScanResult:
     """Check if the file extension is in the dangerous list."""
     ext = filepath.suffix.lower()
-    if ext in DANGEROUS_EXTENSIONS:
+    if ext in _DANGEROUS_EXTENSIONS:
         return False, f"Dangerous file extension detected: '{ext}'"
     return True, ""
 
 
+def _check_magic_data(data: Union[mmap.mmap, bytes]) -> ScanResult:
+    """Compare the start of already-mapped file data against known signatures."""
+    header = data[:16]
+    for offset, by_length in _SIGNATURES_BY_OFFSET.items():
+        for length, signatures in by_length:
+            description = signatures.get(header[offset: offset + length])
+            if description:
+                return False, f"Dangerous file signature detected: {description}"
+
+    return True, ""
+
+
 def check_magic_bytes(filepath: Path) -> ScanResult:
     """
     Read the first bytes of the file and compare against known
     executable/malicious file signatures.
     """
     try:
-        with open(filepath, "rb") as f:
-            header = f.read(16)
+        with _mapped_file(filepath) as data:
+            return _check_magic_data(data)
     except OSError as e:
         log.warning(f"Could not read file for magic byte check: {e}")
         return True, ""  # Can't read → don't block, but log
 
-    for offset, signature, description in DANGEROUS_SIGNATURES:
-        chunk = header[offset: offset + len(signature)]
-        if chunk == signature:
-            return False, f"Dangerous file signature detected: {description}"
-
-    return True, ""
-
 
 def _calculate_entropy(data: bytes) -> float:
     """Calculate Shannon entropy of a byte sequence."""
     if not data:
         return 0.0
-    freq = [0] * 256
-    for byte in data:
-        freq[byte] += 1
+    if np is not None:
+        counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+        probs = counts[counts > 0] / len(data)
+        return float(-(probs * np.log2(probs)).sum())
+    # Counter tallies in C; only byte values that occur get a bin
     length = len(data)
     entropy = 0.0
-    for count in freq:
-        if count > 0:
-            p = count / length
-            entropy -= p * math.log2(p)
+    for count in Counter(data).values():
+        p = count / length
+        entropy -= p * math.log2(p)
     return entropy
 
 
+def _check_entropy_data(data: Union[mmap.mmap, bytes]) -> ScanResult:
+    """
+    Entropy check on the first and the last ENTROPY_SAMPLE_SIZE bytes of
+    mapped file data. Each sample is judged on its own, so a packed payload
+    appended to an innocuous file is not averaged away by its header.
+    """
+    # Skip very small files (< 512 bytes) — entropy is unreliable
+    if len(data) < 512:
+        return True, ""
+
+    samples = [data[:ENTROPY_SAMPLE_SIZE]]
+    if len(data) > ENTROPY_SAMPLE_SIZE:
+        samples.append(data[-ENTROPY_SAMPLE_SIZE:])
+
+    entropy = max(_calculate_entropy(sample) for sample in samples)
+    if entropy > ENTROPY_THRESHOLD:
+        return (
+            False,
+            f"Suspiciously high entropy ({entropy:.2f}/8.0) — file may be packed, "
+            f"encrypted, or obfuscated malware.",
+        )
+    return True, ""
+
+
 def check_entropy(filepath: Path) -> ScanResult:
     """
     Calculate Shannon entropy on a sample of the file.
     High entropy (> threshold) may indicate packed/encrypted malware.
     """
     try:
-        with open(filepath, "rb") as f:
-            sample = f.read(ENTROPY_SAMPLE_SIZE)
+        with _mapped_file(filepath) as data:
+            return _check_entropy_data(data)
     except OSError as e:
         log.warning(f"Could not read file for entropy check: {e}")
         return True, ""
 
-    # Skip very small files (< 512 bytes) — entropy is unreliable
-    if len(sample) < 512:
-        return True, ""
 
-    entropy = _calculate_entropy(sample)
-    if entropy > ENTROPY_THRESHOLD:
+def _check_script_patterns_data(data: Union[mmap.mmap, bytes]) -> ScanResult:
+    """
+    Search mapped file data for the suspicious script patterns. Data over
+    _MAX_PATTERN_SCAN_SIZE is only searched in its first and last
+    _PATTERN_SAMPLE_SIZE bytes, keeping the cost bounded.
+    """
+    # Search the mapping directly (pos/endpos bound the search without slicing);
+    # the file is never read into memory
+    size = len(data)
+    if size <= _MAX_PATTERN_SCAN_SIZE:
+        match = _SCRIPT_PATTERN_RE.search(data)
+    else:
+        match = (
+            _SCRIPT_PATTERN_RE.search(data, 0, _PATTERN_SAMPLE_SIZE)
+            or _SCRIPT_PATTERN_RE.search(data, size - _PATTERN_SAMPLE_SIZE)
+        )
+    if match:
+        matched = match.group()
+        pattern = _PATTERN_BY_LOWER.get(matched.lower(), matched)
         return (
             False,
-            f"Suspiciously high entropy ({entropy:.2f}/8.0) — file may be packed, "
-            f"encrypted, or obfuscated malware.",
+            f"Suspicious script pattern detected: '{pattern.decode('utf-8', errors='replace')}'",
         )
+
     return True, ""
 
 
 def check_script_patterns(filepath: Path) -> ScanResult:
     """
     Scan text-like files for known malicious script patterns.
-    Only applied to files under 10 MB to avoid performance issues.
+    Files over 10 MB are only searched near their start and end to avoid
+    performance issues.
     """
-    max_scan_size = 10 * 1024 * 1024  # 10 MB
     try:
-        size = filepath.stat().st_size
-        if size > max_scan_size:
-            return True, ""  # Too large to pattern-scan efficiently
-
-        with open(filepath, "rb") as f:
-            content = f.read()
+        with _mapped_file(filepath) as data:
+            return _check_script_patterns_data(data)
     except OSError as e:
         log.warning(f"Could not read file for pattern check: {e}")
         return True, ""
 
-    content_upper = content.upper()
-    for pattern in SUSPICIOUS_PATTERNS:
-        if pattern.upper() in content_upper:
-            return (
-                False,
-                f"Suspicious script pattern detected: '{pattern.decode('utf-8', errors='replace')}'",
-            )
+
+# Checks that look at file content. scan_content maps the file once and runs
+# all of them over that one mapping instead of reopening it per check.
+_CONTENT_CHECKS = (
+    ("Magic bytes check",     _check_magic_data),
+    ("Entropy check",         _check_entropy_data),
+    ("Script pattern check",  _check_script_patterns_data),
+)
+
+
+def scan_content(filepath: Path) -> ScanResult:
+    """
+    Run the content checks (magic bytes, entropy, script patterns) on a file.
+
+    Unlike scan_file this skips the extension check, so a caller can reject
+    a dangerous extension up front and read the content separately. A failed
+    check is only logged at debug level, so this can run on a background
+    thread without printing mid-prompt; pass the result to log_scan_result
+    to record the outcome.
+    """
+    filepath = Path(filepath)
+
+    try:
+        with _mapped_file(filepath) as data:
+            for check_name, check_fn in _CONTENT_CHECKS:
+                is_safe, reason = check_fn(data)
+                if not is_safe:
+                    log.debug(f"  ✗ {check_name} failed")
+                    return False, reason
+                log.debug(f"  ✓ {check_name} passed")
+    except OSError as e:
+        log.warning(f"Could not read file for content checks: {e}")
+        # Can't read → don't block, but log
 
     return True, ""
 
 
+def log_scan_result(filepath: Path, result: ScanResult) -> ScanResult:
+    """Log the outcome of a security scan and return the result unchanged."""
+    is_safe, reason = result
+    if is_safe:
+        log.info(f"File '{Path(filepath).name}' passed all security checks.")
+    else:
+        log.warning(f"Security check FAILED for '{Path(filepath).name}': {reason}")
+    return result
+
+
 def scan_file(filepath: Path) -> ScanResult:
     """
     Run all security checks on a file.
@@ -139,20 +288,9 @@ def scan_file(filepath: Path) -> ScanResult:
 
     log.info(f"Scanning file: {filepath.name}")
 
-    checks = [
-        ("Extension check",       check_extension),
-        ("Magic bytes check",     check_magic_bytes),
-        ("Entropy check",         check_entropy),
-        ("Script pattern check",  check_script_patterns),
-    ]
-
-    for check_name, check_fn in checks:
-        is_safe, reason = check_fn(filepath)
-        if not is_safe:
-            log.warning(f"Security check FAILED [{check_name}] for '{filepath.name}': {reason}")
-            return False, reason
-        log.debug(f"  ✓ {check_name} passed")
-
-    log.info(f"File '{filepath.name}' passed all security checks.")
-    return True, ""
+    result = check_extension(filepath)
+    if result[0]:
+        log.debug("  ✓ Extension check passed")
+        result = scan_content(filepath)
 
+    return log_scan_result(filepath, result)
@@ -6,24 +6,68 @@ Handles secure file storage: encrypting files on upload and decrypting on downlo
 Prevents directory traversal attacks by validating all paths stay within STORAGE_DIR.
 """
 
+import errno
 import os
+import re
 import shutil
+import tempfile
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, List, Optional
 
 from config import STORAGE_DIR
 from crypto import encrypt_file, decrypt_file
 from logger import log
 
+# Characters a file ID may contain, in dashed or plain form
+_SAFE_ID_RE = re.compile(r"[A-Za-z0-9-]{1,64}")
+
 
 def _init_storage() -> None:
     """Ensure the storage directory exists with restricted permissions."""
-    STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+    _init_storage_dir(STORAGE_DIR)
+
+
+@lru_cache(maxsize=None)
+def _init_storage_dir(storage_dir: Path) -> None:
+    """Create and lock down a storage directory; runs once per directory."""
+    storage_dir.mkdir(parents=True, exist_ok=True)
     # On Unix-like systems, restrict directory to owner only
+    # (Windows doesn't support chmod the same way)
+    if os.name == "posix":
+        os.chmod(storage_dir, 0o700)
+
+
+def _iter_nested_files(directory: str, visited_dirs: Optional[List[str]] = None) -> Iterator[os.DirEntry]:
+    """
+    Yield a DirEntry for every regular file below directory, at any depth.
+
+    Uses os.scandir so file/directory checks come from the cached dirent type
+    instead of an extra stat() per entry. Symlinks are never followed.
+    If visited_dirs is given, every directory walked (including directory
+    itself) is appended to it deepest-first, ready for bottom-up removal.
+    """
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_nested_files(entry.path, visited_dirs)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+    if visited_dirs is not None:
+        visited_dirs.append(directory)
+
+
+def _same_fs_move(src: str, dst: str) -> None:
+    """
+    Move a file with a single rename, which is all a move within STORAGE_DIR
+    needs. Only a cross-device move (EXDEV) falls back to shutil.move.
+    """
     try:
-        os.chmod(STORAGE_DIR, 0o700)
-    except (AttributeError, NotImplementedError):
-        pass  # Windows doesn't support chmod the same way
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
 
 
 def flatten_storage() -> int:
@@ -39,39 +83,53 @@ def flatten_storage() -> int:
         The number of files that were relocated.
     """
     _init_storage()
-    storage_root = STORAGE_DIR.resolve()
+    storage_root = str(STORAGE_DIR.resolve())
     relocated = 0
 
     # Collect all immediate child subdirectories (non-recursive at top level
-    # so we can rmtree each one cleanly after draining it).
-    subdirs = [p for p in storage_root.iterdir() if p.is_dir()]
+    # so we can remove each one cleanly after draining it). The same pass
+    # records every name already taken at the top level, so collisions are
+    # resolved against this set instead of a stat per candidate name.
+    subdirs = []
+    taken = set()
+    with os.scandir(storage_root) as it:
+        for entry in it:
+            taken.add(entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
 
     for subdir in subdirs:
         # Walk the entire subtree of this nested directory.
-        for nested_file in list(subdir.rglob("*")):
-            if not nested_file.is_file():
-                continue
-
-            dest = storage_root / nested_file.name
+        walked_dirs: List[str] = []
+        for nested_file in list(_iter_nested_files(subdir, walked_dirs)):
+            dest_name = nested_file.name
 
             # Resolve filename collision: append _1, _2, … until unique.
-            if dest.exists():
-                stem = nested_file.stem
-                suffix = nested_file.suffix
+            if dest_name in taken:
+                stem, suffix = os.path.splitext(nested_file.name)
                 counter = 1
-                while dest.exists():
-                    dest = storage_root / f"{stem}_{counter}{suffix}"
+                while dest_name in taken:
+                    dest_name = f"{stem}_{counter}{suffix}"
                     counter += 1
 
-            shutil.move(str(nested_file), str(dest))
+            dest = os.path.join(storage_root, dest_name)
+            _same_fs_move(nested_file.path, dest)
+            taken.add(dest_name)
             log.info(
-                f"flatten_storage: moved '{nested_file}' → '{dest.name}'"
+                f"flatten_storage: moved '{nested_file.path}' → '{dest_name}'"
             )
             relocated += 1
 
-        # Remove the now-empty subdirectory tree.
+        # Remove the now-empty subdirectory tree bottom-up from the directories
+        # already walked; only fall back to rmtree if something that is not a
+        # regular file (e.g. a symlink) was left behind.
         try:
-            shutil.rmtree(subdir)
+            try:
+                for directory in walked_dirs:
+                    os.rmdir(directory)
+            except OSError:
+                shutil.rmtree(subdir)
+            taken.discard(os.path.basename(subdir))
             log.info(f"flatten_storage: removed nested directory '{subdir}'")
         except OSError as e:
             log.warning(f"flatten_storage: could not remove '{subdir}': {e}")
@@ -84,20 +142,25 @@ def flatten_storage() -> int:
     return relocated
 
 
+@lru_cache(maxsize=None)
+def _resolved_root(storage_dir: Path) -> Path:
+    """Resolve a storage directory once instead of on every path lookup."""
+    return storage_dir.resolve()
+
+
 def _safe_storage_path(file_id: str) -> Path:
     """
     Compute the storage path for a file ID and verify it stays within STORAGE_DIR.
     Raises ValueError on directory traversal attempts.
     """
-    _init_storage()
-    stored_name = file_id.replace("-", "") + ".sdf"  # SafeDrop File extension
-    candidate = (STORAGE_DIR / stored_name).resolve()
-
-    # Prevent directory traversal
-    if not str(candidate).startswith(str(STORAGE_DIR.resolve())):
+    # Prevent directory traversal: IDs may only contain letters, digits and
+    # dashes, so no separator, "." or drive prefix can reach the filesystem.
+    if not _SAFE_ID_RE.fullmatch(file_id):
         raise ValueError(f"Directory traversal detected for ID: {file_id}")
 
-    return candidate
+    _init_storage()
+    stored_name = file_id.replace("-", "") + ".sdf"  # SafeDrop File extension
+    return _resolved_root(STORAGE_DIR) / stored_name
 
 
 def store_file(src_path: Path, file_id: str, encryption_key: str) -> Path:
@@ -107,7 +170,7 @@ def store_file(src_path: Path, file_id: str, encryption_key: str) -> Path:
     Args:
         src_path:       Path to the source file.
         file_id:        The unique file ID (used to name the stored file).
-        encryption_key: Base64 Fernet key string.
+        encryption_key: Base64 AES-256 key string.
 
     Returns:
         Path to the stored encrypted file.
@@ -122,6 +185,34 @@ def store_file(src_path: Path, file_id: str, encryption_key: str) -> Path:
     return dest_path
 
 
+@lru_cache(maxsize=None)
+def _umask() -> int:
+    """The process umask (it can only be read by setting it, so read once)."""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def _reserve_destination(dest_dir: Path, name: str) -> Path:
+    """
+    Atomically claim a free filename in dest_dir, appending _1, _2, … on
+    collision. O_EXCL makes the existence check and the creation a single
+    step, so a file that appears concurrently is never overwritten.
+    """
+    stem, suffix = Path(name).stem, Path(name).suffix
+    dest_path = dest_dir / name
+    counter = 0
+    while True:
+        try:
+            fd = os.open(dest_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+        except FileExistsError:
+            counter += 1
+            dest_path = dest_dir / f"{stem}_{counter}{suffix}"
+            continue
+        os.close(fd)
+        return dest_path
+
+
 def retrieve_file(file_id: str, dest_dir: Path, original_name: str, encryption_key: str) -> Path:
     """
     Decrypt and restore a stored file to the destination directory.
@@ -130,7 +221,7 @@ def retrieve_file(file_id: str, dest_dir: Path, original_name: str, encryption_k
         file_id:         The unique file ID.
         dest_dir:        Directory where the file will be restored.
         original_name:   The original filename to restore as.
-        encryption_key:  Base64 Fernet key string.
+        encryption_key:  Base64 AES-256 key string.
 
     Returns:
         Path to the restored (decrypted) file.
@@ -152,19 +243,26 @@ def retrieve_file(file_id: str, dest_dir: Path, original_name: str, encryption_k
     if not safe_name:
         safe_name = "safedrop_file"
 
-    dest_path = dest_dir / safe_name
-
-    # Handle filename collisions
-    if dest_path.exists():
-        stem = dest_path.stem
-        suffix = dest_path.suffix
-        counter = 1
-        while dest_path.exists():
-            dest_path = dest_dir / f"{stem}_{counter}{suffix}"
-            counter += 1
+    dest_path = _reserve_destination(dest_dir, safe_name)
 
     log.info(f"Retrieving file ID '{file_id}' → '{dest_path}'")
-    decrypt_file(stored_path, dest_path, encryption_key)
+    # Decrypt into a hidden temp file next to the destination and rename it
+    # over the reserved name, so that name only ever holds fully verified
+    # plaintext (or nothing).
+    tmp_name = None
+    try:
+        fd, tmp_name = tempfile.mkstemp(dir=dest_dir, prefix=".safedrop-", suffix=".part")
+        os.close(fd)
+        decrypt_file(stored_path, Path(tmp_name), encryption_key)
+        # mkstemp creates the file owner-only; give the restored file the
+        # permissions a normally created file would get
+        os.chmod(tmp_name, 0o666 & ~_umask())
+        os.replace(tmp_name, dest_path)
+    except BaseException:
+        for leftover in (tmp_name, dest_path):
+            if leftover is not None and os.path.lexists(leftover):
+                os.unlink(leftover)
+        raise
     log.info(f"File retrieved successfully: {dest_path}")
 
     return dest_path
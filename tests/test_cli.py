@@ -0,0 +1,22 @@
+# Codes By Visionnn
+
+import pytest
+
+from cli import format_size
+
+
+class TestFormatSize:
+    @pytest.mark.parametrize("size,expected", [
+        (0, "0 B"),
+        (1, "1 B"),
+        (1023, "1023 B"),
+        (1024, "1.0 KB"),
+        (1536, "1.5 KB"),
+        (1024 ** 2 - 1, "1024.0 KB"),
+        (1024 ** 2, "1.0 MB"),
+        (500 * 1024 ** 2, "500.0 MB"),
+        (1024 ** 3, "1.00 GB"),
+        (5 * 1024 ** 4, "5120.00 GB"),
+    ])
+    def test_units(self, size, expected):
+        assert format_size(size) == expected
@@ -5,7 +5,7 @@ import tempfile
 from pathlib import Path
 
 import pytest
-from cryptography.fernet import InvalidToken
+from cryptography.exceptions import InvalidTag
 
 from crypto import generate_key, encrypt_file, decrypt_file
 
@@ -26,12 +26,13 @@ class TestGenerateKey:
         keys = {generate_key() for _ in range(100)}
         assert len(keys) == 100
 
-    def test_valid_fernet_key(self):
-        """Key should be usable by Fernet without error."""
-        from cryptography.fernet import Fernet
-        key = generate_key()
-        fernet = Fernet(key.encode("utf-8"))
-        assert fernet is not None
+    def test_valid_aes_key(self):
+        """Key should decode to a 256-bit AES key."""
+        import base64
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        key = base64.urlsafe_b64decode(generate_key())
+        assert len(key) == 32
+        assert AESGCM(key) is not None
 
 
 class TestEncryptDecryptRoundtrip:
@@ -68,7 +69,7 @@ class TestEncryptDecryptRoundtrip:
             src.unlink(missing_ok=True)
 
     def test_wrong_key_raises(self, tmp_path):
-        """Decrypting with the wrong key should raise InvalidToken."""
+        """Decrypting with the wrong key should raise InvalidTag."""
         content = b"Secret data"
         src = _make_temp_file(content)
         enc = tmp_path / "encrypted.sdf"
@@ -78,11 +79,61 @@ class TestEncryptDecryptRoundtrip:
 
         try:
             encrypt_file(src, enc, key1)
-            with pytest.raises(InvalidToken):
+            with pytest.raises(InvalidTag):
                 decrypt_file(enc, dec, key2)
         finally:
             src.unlink(missing_ok=True)
 
+    def test_wrong_key_leaves_no_output(self, tmp_path):
+        """A failed authentication check must not leave partial plaintext behind."""
+        content = os.urandom(3 * 1024 * 1024)
+        src = _make_temp_file(content)
+        enc = tmp_path / "encrypted.sdf"
+        dec = tmp_path / "decrypted.bin"
+
+        try:
+            encrypt_file(src, enc, generate_key())
+            with pytest.raises(InvalidTag):
+                decrypt_file(enc, dec, generate_key())
+            assert not dec.exists()
+        finally:
+            src.unlink(missing_ok=True)
+
+    def test_streamed_output_matches_one_shot_aesgcm(self, tmp_path, monkeypatch):
+        """The layout is id || nonce || ciphertext || tag, as produced by AESGCM."""
+        import base64
+        import crypto
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        monkeypatch.setattr(crypto, "_has_aes_acceleration", lambda: True)
+        content = os.urandom(2 * 1024 * 1024 + 7)
+        src = _make_temp_file(content)
+        enc = tmp_path / "encrypted.sdf"
+        key = generate_key()
+
+        try:
+            encrypt_file(src, enc, key)
+            data = enc.read_bytes()
+            assert data[0] == crypto.ALG_AES_256_GCM
+            aesgcm = AESGCM(base64.urlsafe_b64decode(key))
+            assert aesgcm.decrypt(data[1:13], data[13:], None) == content
+        finally:
+            src.unlink(missing_ok=True)
+
+    def test_unknown_algorithm_id_raises(self, tmp_path):
+        content = b"Secret data"
+        src = _make_temp_file(content)
+        enc = tmp_path / "encrypted.sdf"
+        dec = tmp_path / "decrypted.txt"
+        key = generate_key()
+
+        try:
+            encrypt_file(src, enc, key)
+            enc.write_bytes(b"\x7f" + enc.read_bytes()[1:])
+            with pytest.raises(InvalidTag):
+                decrypt_file(enc, dec, key)
+        finally:
+            src.unlink(missing_ok=True)
+
     def test_empty_file_roundtrip(self, tmp_path):
         """Empty files should encrypt and decrypt correctly."""
         content = b""
@@ -98,3 +149,68 @@ class TestEncryptDecryptRoundtrip:
         finally:
             src.unlink(missing_ok=True)
 
+    def test_legacy_fernet_file_decrypts(self, tmp_path):
+        """Files stored as Fernet tokens by older releases are still readable."""
+        from cryptography.fernet import Fernet
+        content = b"Stored before the AES-GCM switch"
+        key = Fernet.generate_key()
+        enc = tmp_path / "legacy.sdf"
+        dec = tmp_path / "decrypted.txt"
+        enc.write_bytes(Fernet(key).encrypt(content))
+
+        decrypt_file(enc, dec, key.decode("utf-8"))
+        assert dec.read_bytes() == content
+
+
+class TestChaCha20Fallback:
+    @pytest.fixture(autouse=True)
+    def no_aes_acceleration(self, monkeypatch):
+        """Pretend the CPU has no AES instructions."""
+        import crypto
+        monkeypatch.setattr(crypto, "_has_aes_acceleration", lambda: False)
+
+    def test_roundtrip(self, tmp_path):
+        content = os.urandom(3 * 1024 * 1024 + 123)
+        src = _make_temp_file(content)
+        enc = tmp_path / "encrypted.sdf"
+        dec = tmp_path / "decrypted.bin"
+        key = generate_key()
+
+        try:
+            encrypt_file(src, enc, key)
+            decrypt_file(enc, dec, key)
+            assert dec.read_bytes() == content
+        finally:
+            src.unlink(missing_ok=True)
+
+    def test_matches_one_shot_chacha20poly1305(self, tmp_path):
+        """The streamed construction is byte-compatible with the RFC 8439 AEAD."""
+        import base64
+        import crypto
+        from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+        content = os.urandom(1024 * 1024 + 5)
+        src = _make_temp_file(content)
+        enc = tmp_path / "encrypted.sdf"
+        key = generate_key()
+
+        try:
+            encrypt_file(src, enc, key)
+            data = enc.read_bytes()
+            assert data[0] == crypto.ALG_CHACHA20_POLY1305
+            aead = ChaCha20Poly1305(base64.urlsafe_b64decode(key))
+            assert aead.decrypt(data[1:13], data[13:], None) == content
+        finally:
+            src.unlink(missing_ok=True)
+
+    def test_wrong_key_raises(self, tmp_path):
+        src = _make_temp_file(b"Secret data")
+        enc = tmp_path / "encrypted.sdf"
+        dec = tmp_path / "decrypted.txt"
+
+        try:
+            encrypt_file(src, enc, generate_key())
+            with pytest.raises(InvalidTag):
+                decrypt_file(enc, dec, generate_key())
+            assert not dec.exists()
+        finally:
+            src.unlink(missing_ok=True)
@@ -1,5 +1,7 @@
 # Codes By Visionnn
 
+import errno
+import os
 import shutil
 from pathlib import Path
 
@@ -79,6 +81,22 @@ class TestFlattenStorage:
         assert (isolated_storage / "clash_1.sdf").exists()
         assert (isolated_storage / "clash_1.sdf").read_bytes() == b"incoming"
 
+    def test_collision_between_nested_files(self, isolated_storage):
+        """Two nested files with the same name both survive the move up."""
+        for name in ("a", "b"):
+            nested = isolated_storage / name
+            nested.mkdir()
+            (nested / "dup.sdf").write_bytes(name.encode())
+
+        result = flatten_storage()
+
+        assert result == 2
+        contents = {
+            (isolated_storage / "dup.sdf").read_bytes(),
+            (isolated_storage / "dup_1.sdf").read_bytes(),
+        }
+        assert contents == {b"a", b"b"}
+
     def test_multiple_nested_dirs(self, isolated_storage):
         """Multiple nested directories are all flattened in one call."""
         for name in ("dir1", "dir2", "dir3"):
@@ -104,3 +122,36 @@ class TestFlattenStorage:
         assert result == 1
         assert (isolated_storage / "readme.txt").exists()
 
+    @pytest.mark.skipif(not hasattr(os, "symlink"), reason="symlinks unsupported")
+    def test_symlinked_dir_not_followed(self, isolated_storage, tmp_path):
+        """Files outside STORAGE_DIR reachable through a symlink are left alone."""
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        (outside / "keep.txt").write_bytes(b"not ours")
+        nested = isolated_storage / "sub"
+        nested.mkdir()
+        try:
+            os.symlink(outside, nested / "link", target_is_directory=True)
+        except OSError:
+            pytest.skip("cannot create symlinks here")
+
+        result = flatten_storage()
+
+        assert result == 0
+        assert (outside / "keep.txt").read_bytes() == b"not ours"
+        assert not (isolated_storage / "keep.txt").exists()
+
+    def test_cross_device_move_falls_back(self, isolated_storage, monkeypatch):
+        """A rename that fails with EXDEV is retried as a copying move."""
+        nested = isolated_storage / "inner"
+        nested.mkdir()
+        (nested / "ABCDWXYZ2345.sdf").write_bytes(b"secret")
+
+        def cross_device_rename(src, dst):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr("storage.os.rename", cross_device_rename)
+        result = flatten_storage()
+
+        assert result == 1
+        assert (isolated_storage / "ABCDWXYZ2345.sdf").read_bytes() == b"secret"
@@ -35,6 +35,14 @@ class TestGenerateId:
         file_id = generate_id()
         assert len(file_id.replace("-", "")) == 12
 
+    def test_uses_full_alphabet(self):
+        """Every alphabet character should be reachable."""
+        from id_generator import _ALPHABET
+        seen = set()
+        for _ in range(2000):
+            seen.update(generate_id().replace("-", ""))
+        assert seen == set(_ALPHABET)
+
 
 class TestNormalizeId:
     def test_adds_dashes(self):
@@ -68,3 +76,11 @@ class TestIsValidIdFormat:
     def test_empty(self):
         assert is_valid_id_format("") is False
 
+    def test_lowercase_accepted(self):
+        assert is_valid_id_format("abcd-wxyz-2345") is True
+
+    def test_ambiguous_chars_rejected(self):
+        assert is_valid_id_format("ABCD-WXYZ-2340") is False
+
+    def test_non_ascii_rejected(self):
+        assert is_valid_id_format("ABCD-WXYZ-234\u00c9") is False
